@@ -0,0 +1,157 @@
+"""
+Counts the subprocesses spawned per render job, before and after
+the render worker.
+
+"Before" is the previous two-pass pipeline, kept here as legacy_render:
+the timeline is written to an intermediate video, which is read back and
+written again with ImageMagick subtitles and the narration. "After" is a
+job on the render worker. Both render the same synthetic footage, so no
+API keys are needed, but "before" needs ImageMagick (IMAGEMAGICK_BINARY
+in .env). Run it from the Backend directory:
+
+    python benchmark_render.py
+"""
+import os
+import math
+import time
+import uuid
+import subprocess
+
+from typing import List
+from collections import Counter
+from termcolor import colored
+from dotenv import load_dotenv
+from timeline import Segment
+from timeline import plan_timeline
+from utils import clean_dir, lazy_import
+
+load_dotenv("../.env")
+
+JOBS = 3
+NARRATION_DURATION = 6.0
+
+_spawned = Counter()
+_popen = subprocess.Popen
+
+class _CountingPopen(_popen):
+    def __init__(self, args, *rest, **kwargs):
+        program = args[0] if isinstance(args, (list, tuple)) else str(args).split()[0]
+        _spawned[os.path.basename(str(program))] += 1
+        super().__init__(args, *rest, **kwargs)
+
+def make_inputs():
+    """
+    Writes two short stock videos, a narration and subtitles to ../temp.
+    """
+    AudioClip = lazy_import("moviepy.audio.AudioClip").AudioClip
+    ColorClip = lazy_import("moviepy.video.VideoClip").ColorClip
+
+    video_paths = []
+    for color in [(200, 40, 40), (40, 40, 200)]:
+        path = f"../temp/{uuid.uuid4()}.mp4"
+        ColorClip((1920, 1080), color, duration=4).write_videofile(path, fps=30, logger=None)
+        video_paths.append(path)
+
+    tts_path = f"../temp/{uuid.uuid4()}.mp3"
+    AudioClip(lambda t: 0 * t, duration=NARRATION_DURATION, fps=44100).write_audiofile(tts_path, logger=None)
+
+    subtitles_path = f"../subtitles/{uuid.uuid4()}.srt"
+    with open(subtitles_path, "w") as f:
+        f.write("1\n00:00:00,000 --> 00:00:02,000\nHello\n\n")
+        f.write("2\n00:00:02,000 --> 00:00:04,000\nfrom the\n\n")
+        f.write("3\n00:00:04,000 --> 00:00:06,000\nbenchmark\n\n")
+
+    return video_paths, tts_path, subtitles_path
+
+def legacy_render(video_paths: List[str], segments: List[Segment], tts_path: str, subtitles_path: str) -> str:
+    """
+    Renders a video the way the backend did before the render worker.
+
+    Returns:
+        str: The path to the rendered video.
+    """
+    crop = lazy_import("moviepy.video.fx.crop").crop
+    resize = lazy_import("moviepy.video.fx.resize").resize
+    TextClip = lazy_import("moviepy.video.VideoClip").TextClip
+    AudioFileClip = lazy_import("moviepy.audio.io.AudioFileClip").AudioFileClip
+    VideoFileClip = lazy_import("moviepy.video.io.VideoFileClip").VideoFileClip
+    SubtitlesClip = lazy_import("moviepy.video.tools.subtitles").SubtitlesClip
+    concatenate_videoclips = lazy_import("moviepy.video.compositing.concatenate").concatenate_videoclips
+    CompositeVideoClip = lazy_import("moviepy.video.compositing.CompositeVideoClip").CompositeVideoClip
+
+    if os.getenv("IMAGEMAGICK_BINARY"):
+        lazy_import("moviepy.config").change_settings({"IMAGEMAGICK_BINARY": os.getenv("IMAGEMAGICK_BINARY")})
+
+    # First pass: a clip per segment, written to an intermediate video
+    clips = []
+    for segment in segments:
+        clip = VideoFileClip(video_paths[segment.clip]).without_audio()
+        clip = clip.subclip(segment.start, segment.end).set_fps(30)
+        scale = max(1080 / clip.w, 1920 / clip.h)
+        clip = clip.fx(resize, (math.ceil(clip.w * scale), math.ceil(clip.h * scale)))
+        clip = crop(clip, width=1080, height=1920, x_center=clip.w / 2, y_center=clip.h / 2)
+        clips.append(clip)
+
+    combined_video_path = f"../temp/{uuid.uuid4()}.mp4"
+    concatenate_videoclips(clips).set_fps(30).write_videofile(combined_video_path, threads=3, logger=None)
+
+    # Second pass: ImageMagick subtitles and the narration
+    generator = lambda txt: TextClip(txt, font="../fonts/bold_font.ttf", fontsize=100, color="#FFFF00",
+    stroke_color="black", stroke_width=5)
+
+    result = CompositeVideoClip([
+        VideoFileClip(combined_video_path),
+        SubtitlesClip(subtitles_path, generator).set_pos(("center", "center"))
+    ])
+    result = result.set_audio(AudioFileClip(tts_path))
+
+    output_path = f"../temp/{uuid.uuid4()}.mp4"
+    result.write_videofile(output_path, threads=3, logger=None)
+
+    return output_path
+
+def run(name: str, render, cleanup) -> None:
+    _spawned.clear()
+    start = time.perf_counter()
+
+    try:
+        for _ in range(JOBS):
+            # Don't keep the benchmark videos around
+            cleanup(render())
+    except Exception as err:
+        print(colored(f"[-] {name}: {err}", "red"))
+        return
+
+    elapsed = (time.perf_counter() - start) / JOBS
+    per_job = sum(_spawned.values()) / JOBS
+    programs = ", ".join(f"{p}: {c / JOBS:g}" for p, c in _spawned.most_common())
+
+    print(colored(f"[+] {name}: {per_job:g} subprocesses and {elapsed:.2f}s per job ({programs})", "green"))
+
+if __name__ == "__main__":
+    from render import get_render_worker
+    from storage import remove_video
+
+    clean_dir("../temp/")
+    clean_dir("../subtitles/")
+
+    video_paths, tts_path, subtitles_path = make_inputs()
+    segments = plan_timeline([4.0, 4.0], NARRATION_DURATION, [2.0, 4.0])
+
+    worker = get_render_worker()
+
+    subprocess.Popen = _CountingPopen
+    try:
+        run(
+            "Before",
+            lambda: legacy_render(video_paths, segments, tts_path, subtitles_path),
+            os.remove,
+        )
+        # The poster is an extra output, leave it out for a fair comparison
+        run(
+            "After",
+            lambda: worker.submit(video_paths, segments, tts_path, subtitles_path, poster=False).result(),
+            remove_video,
+        )
+    finally:
+        subprocess.Popen = _popen
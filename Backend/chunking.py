@@ -0,0 +1,186 @@
+import os
+import re
+import math
+import uuid
+import tempfile
+import subprocess
+
+from typing import List
+from utils import lazy_import
+
+# Words ending with a period that never end a sentence
+ABBREVIATIONS = {
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "vs", "e.g", "i.e", "approx",
+}
+
+# Abbreviations that end a sentence when the next word is capitalized
+SENTENCE_FINAL_ABBREVIATIONS = {"etc", "inc", "ltd", "co", "st", "u.s", "u.k"}
+
+# Abbreviations that only don't end a sentence before a number, e.g. "No. 5"
+NUMBER_ABBREVIATIONS = {"no"}
+
+# A sentence ends with ., ! or ?, optionally followed by quotes or brackets
+_SENTENCE_END = re.compile(r"[.!?]+[\"')\]]*(?=\s)")
+
+# Places inside a sentence where it can be split without sounding off
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+
+def split_sentences(text: str) -> List[str]:
+    """
+    Splits a text into sentences on ., ! and ?, skipping
+    common abbreviations and decimal numbers.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        List[str]: The sentences, without surrounding whitespace.
+    """
+    sentences = []
+    start = 0
+
+    for match in _SENTENCE_END.finditer(text):
+        if match.group().startswith("."):
+            last_word = (text[start:match.start()].split() or [""])[-1].lstrip("\"'([").lower()
+            next_word = (text[match.end():].split() or [""])[0].lstrip("\"'([")
+
+            if last_word in ABBREVIATIONS:
+                continue
+            if last_word in NUMBER_ABBREVIATIONS and next_word[:1].isdigit():
+                continue
+            if last_word in SENTENCE_FINAL_ABBREVIATIONS and next_word and not next_word[0].isupper():
+                continue
+
+        sentences.append(text[start:match.end()].strip())
+        start = match.end()
+
+    sentences.append(text[start:].strip())
+
+    return [sentence for sentence in sentences if sentence]
+
+def _split_long(sentence: str, max_chars: int, target_chars: int) -> List[str]:
+    # Split on clauses first, then on words into pieces of about
+    # target_chars, so no piece exceeds max_chars
+    if len(sentence) <= max_chars:
+        return [sentence]
+
+    clauses = [c for c in _CLAUSE_END.split(sentence) if c]
+
+    pieces = []
+    for clause in clauses:
+        if len(clause) <= max_chars:
+            pieces.append(clause)
+            continue
+
+        # Spread the words evenly instead of filling pieces up to the limit
+        piece_count = math.ceil(len(clause) / target_chars)
+        limit = min(len(clause) / piece_count, max_chars)
+
+        current = ""
+        for word in clause.split():
+            if current and len(current) + 1 + len(word) > limit:
+                pieces.append(current)
+                current = ""
+            # A single word longer than the limit has to be cut
+            while len(word) > max_chars:
+                pieces.append(word[:max_chars])
+                word = word[max_chars:]
+            current = f"{current} {word}".strip()
+        if current:
+            pieces.append(current)
+
+    return pieces
+
+def chunk_text(text: str, max_chars: int, target_chars: int = None) -> List[str]:
+    """
+    Splits a text into chunks for text-to-speech.
+
+    Chunks end on sentence boundaries where possible, never exceed
+    max_chars, and are balanced around target_chars, so they can be
+    synthesized in parallel without many tiny requests.
+
+    Args:
+        text (str): The text to split.
+        max_chars (int): The most characters a provider accepts per request.
+        target_chars (int): The preferred chunk size, defaults to max_chars.
+
+    Returns:
+        List[str]: The chunks, in order.
+    """
+    target_chars = min(target_chars or max_chars, max_chars)
+
+    pieces = []
+    for sentence in split_sentences(text):
+        pieces += _split_long(sentence, max_chars, target_chars)
+
+    if not pieces:
+        return []
+
+    # Spread the text evenly over as many chunks as the target asks for
+    remaining_chars = sum(len(piece) + 1 for piece in pieces) - 1
+    remaining_chunks = max(round(remaining_chars / target_chars), 1)
+
+    chunks = []
+    current = ""
+    for piece in pieces:
+        if current:
+            combined = len(current) + 1 + len(piece)
+
+            # Aim for an equal share of what is left, so the
+            # differences don't pile up in the last chunk
+            goal = remaining_chars / remaining_chunks
+
+            # Close the chunk if the piece does not fit, or if adding it
+            # overshoots the goal by more than leaving it out falls short
+            overshoots = remaining_chunks > 1 and combined - goal > goal - len(current)
+            if combined > max_chars or overshoots:
+                chunks.append(current)
+                remaining_chars -= len(current) + 1
+                remaining_chunks = max(remaining_chunks - 1, 1)
+                current = ""
+
+        current = f"{current} {piece}".strip()
+
+    chunks.append(current)
+
+    return chunks
+
+def join_audio(parts: List[bytes], filename: str) -> None:
+    """
+    Joins MP3 files into one, with ffmpeg's concat demuxer.
+
+    Concatenating the bytes (or base64) of separate MP3s leaves the
+    headers of the first file in place, so players report the wrong
+    duration; remuxing writes headers for the joined audio.
+
+    Args:
+        parts (List[bytes]): The MP3 files, in order.
+        filename (str): Where to save the joined audio.
+
+    Returns:
+        None
+    """
+    if len(parts) == 1:
+        with open(filename, "wb") as f:
+            f.write(parts[0])
+        return
+
+    ffmpeg = lazy_import("moviepy.config").get_setting("FFMPEG_BINARY")
+
+    with tempfile.TemporaryDirectory() as directory:
+        list_path = os.path.join(directory, "parts.txt")
+
+        with open(list_path, "w") as list_file:
+            for part in parts:
+                part_path = os.path.join(directory, f"{uuid.uuid4()}.mp3")
+                with open(part_path, "wb") as f:
+                    f.write(part)
+                list_file.write(f"file '{part_path}'\n")
+
+        subprocess.run([
+            ffmpeg, "-y", "-loglevel", "error",
+            "-f", "concat", "-safe", "0",
+            "-i", list_path,
+            "-c", "copy",
+            filename,
+        ], check=True)
@@ -1,47 +1,146 @@
 import os
-from dotenv import load_dotenv
 import time
-import elevenlabs
-from elevenlabs import generate, play, voices, Voice, set_api_key
+import threading
+from dotenv import load_dotenv
+from utils import lazy_import
+from chunking import chunk_text, join_audio
+from concurrent.futures import ThreadPoolExecutor
+from termcolor import colored
 
 load_dotenv()
 
 API_KEY = os.getenv("ELEVENLABS_API_KEY")
-set_api_key(API_KEY)
+
+VOICES = ["Paddington", "DanDan", "Sally", "Aaryan", "Eleguar", "Readwell", "Knightley"]
+
+# Characters per request the model accepts, and the chunk size
+# that keeps latency low while avoiding many tiny requests
+MAX_CHUNK_SIZE = 2500
+TARGET_CHUNK_SIZE = 250
+MAX_PARALLEL_REQUESTS = 4
+
+# How often the cached voice catalog is refreshed, in seconds
+VOICE_REFRESH_INTERVAL = 60 * 60
+
+_client_lock = threading.Lock()
+_api_key_set = False
+
+_catalog_lock = threading.Lock()
+_voice_catalog = None
+
+
+def _client():
+    """
+    Loads the elevenlabs module on first use and sets the API key once.
+    """
+    global _api_key_set
+
+    elevenlabs = lazy_import("elevenlabs")
+
+    if not _api_key_set:
+        with _client_lock:
+            if not _api_key_set:
+                elevenlabs.set_api_key(API_KEY)
+                _api_key_set = True
+
+    return elevenlabs
+
+
+def _fetch_voices() -> dict:
+    # Map voice names to voice objects
+    return {v.name: v for v in _client().voices()}
+
+
+def _refresh_voices() -> None:
+    global _voice_catalog
+
+    while True:
+        time.sleep(VOICE_REFRESH_INTERVAL)
+        try:
+            _voice_catalog = _fetch_voices()
+        except Exception as e:
+            # Keep serving the previous catalog
+            print(colored(f"[-] Could not refresh ElevenLabs voices: {e}", "red"))
+
+
+def get_voices() -> dict:
+    """
+    Returns the ElevenLabs voice catalog, keyed by voice name.
+
+    The catalog is fetched once and then refreshed in the background
+    every VOICE_REFRESH_INTERVAL seconds.
+    """
+    global _voice_catalog
+
+    if _voice_catalog is None:
+        with _catalog_lock:
+            if _voice_catalog is None:
+                _voice_catalog = _fetch_voices()
+                threading.Thread(target=_refresh_voices, daemon=True).start()
+
+    return _voice_catalog
+
+
+def warm_voices() -> threading.Thread:
+    """
+    Loads elevenlabs and fetches the voice catalog in a background
+    thread, so the first request does not have to wait for it.
+    """
+    def warm():
+        try:
+            get_voices()
+        except Exception as e:
+            print(colored(f"[-] Could not fetch ElevenLabs voices: {e}", "red"))
+
+    thread = threading.Thread(target=warm, daemon=True)
+    thread.start()
+
+    return thread
+
+
+def _generate(text: str, voice_obj) -> bytes:
+    # Generate audio for a single chunk, retrying on API errors
+    elevenlabs = _client()
+
+    retry_count = 50  # Number of retries
+    while retry_count > 0:
+        try:
+            print(f'Generating audio for {voice_obj.name}... {text}')
+            return elevenlabs.generate(text=text, voice=voice_obj, model="eleven_multilingual_v1")
+        except elevenlabs.api.error.APIError as e:
+            print(f"Error: {e}")
+            print("Retrying...")
+            time.sleep(5)  # Add a delay before retrying
+            retry_count -= 1
+
+    print("Maximum retries reached. Skipping this message.")
+    return None
+
 
 def tts(
     text: str,
     voice: str = "none",
     filename: str = "output.mp3"
 ):
-    # Get voice id from the provided list
-    voices_list = ["Paddington", "DanDan", "Sally", "Aaryan", "Eleguar", "Readwell", "Knightley"]
-    if voice not in voices_list:
-        print("Invalid voice id. Please choose from:", voices_list)
+    # Check the voice id against the provided list
+    if voice not in VOICES:
+        print("Invalid voice id. Please choose from:", VOICES)
         return
 
     # Find the corresponding voice object
-    voice_obj = next((v for v in voices() if v.name == voice), None)
+    voice_obj = get_voices().get(voice)
     if not voice_obj:
         print("Voice not found.")
         return
 
-    retry_count = 50  # Number of retries
-    while retry_count > 0:
-        try:
-            print(f'Generating audio for {voice}... {text}')
-            audio = generate(text=text, voice=voice_obj, model="eleven_multilingual_v1")
-            output_path = os.path.join(filename)
-            
-            with open(output_path, 'wb') as f:
-                f.write(audio)
-            print(f"Audio saved to {output_path}")
-            break  # Break out of the retry loop if successful
-        except elevenlabs.api.error.APIError as e:
-            print(f"Error: {e}")
-            print("Retrying...")
-            time.sleep(5)  # Add a delay before retrying
-            retry_count -= 1
-            if retry_count == 0:
-                print("Maximum retries reached. Skipping this message.")
-                break
+    # Split the text into balanced chunks and generate them in parallel
+    chunks = chunk_text(text, MAX_CHUNK_SIZE, TARGET_CHUNK_SIZE)
+    with ThreadPoolExecutor(max_workers=MAX_PARALLEL_REQUESTS) as executor:
+        parts = list(executor.map(lambda chunk: _generate(chunk, voice_obj), chunks))
+
+    if not parts or None in parts:
+        return
+
+    output_path = os.path.join(filename)
+    join_audio(parts, output_path)
+    print(f"Audio saved to {output_path}")
@@ -1,8 +1,8 @@
 import re
-import g4f
 import json
 
 from typing import List
+from utils import lazy_import
 from termcolor import colored
 
 def generate_script(video_subject: str) -> str:
@@ -38,6 +38,7 @@ def generate_script(video_subject: str) -> str:
     """
 
     # Generate script
+    g4f = lazy_import("g4f")
     response = g4f.ChatCompletion.create(
         model=g4f.models.gpt_35_turbo_16k_0613,
         messages=[{"role": "user", "content": prompt}],
@@ -94,6 +95,7 @@ def get_search_terms(video_subject: str, amount: int, script: str) -> List[str]:
     """
 
     # Generate search terms
+    g4f = lazy_import("g4f")
     response = g4f.ChatCompletion.create(
         model=g4f.models.gpt_35_turbo_16k_0613,
         messages=[{"role": "user", "content": prompt}],
@@ -1,35 +1,50 @@
+import time
+
+# Measure startup from the very first import
+STARTED_AT = time.perf_counter()
+
 import os
 import random
 from gpt import *
 from video import *
 from utils import *
 from search import *
+from timeline import *
+from render import get_render_worker
+from storage import stored_path
 from uuid import uuid4
 from tiktokvoice import tts as tiktok_tts
 from elevenvoice import tts as eleven_tts
+from elevenvoice import VOICES as ELEVEN_VOICES, warm_voices
 from flask_cors import CORS
 from termcolor import colored
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify
-from moviepy.config import change_settings
+from flask import Flask, request, jsonify, abort, send_file
+from werkzeug.serving import is_running_from_reloader
 
 load_dotenv("../.env")
 
 SESSION_ID = os.getenv("TIKTOK_SESSION_ID")
 
-change_settings({"IMAGEMAGICK_BINARY": os.getenv("IMAGEMAGICK_BINARY")})
-
 app = Flask(__name__)
 CORS(app)
 
 HOST = "0.0.0.0"
 PORT = 8080
+DEBUG = True
 AMOUNT_OF_STOCK_VIDEOS = 5
+VIDEOS_PER_SEARCH_TERM = 3
+# Extra seconds saved of every video, in case a cut lands after the last keyframe
+FOOTAGE_MARGIN = 1.0
+# Browsers may cache stored videos for a year
+STORED_VIDEO_MAX_AGE = 365 * 24 * 60 * 60
 
 
 # Generation Endpoint
 @app.route("/api/generate", methods=["POST"])
 def generate():
+    AudioFileClip = lazy_import("moviepy.audio.io.AudioFileClip").AudioFileClip
+
     try:
         # Clean
         clean_dir("../temp/")
@@ -44,9 +59,8 @@ def generate():
         print(colored("   Voice: " + data["voice"], "blue"))
         
         # Get voice
-        eleven_voices = ["Paddington", "DanDan", "Sally", "Aaryan", "Eleguar", "Readwell", "Knightley"]
         eleven_voice = data["voice"]
-        if eleven_voice not in eleven_voices:
+        if eleven_voice not in ELEVEN_VOICES:
             print(colored("[-] Invalid voice.", "red"))
             return jsonify(
                 {
@@ -62,83 +76,112 @@ def generate():
         # Remove *, #, and other special characters from the script
         script = remove_special_characters(script)
 
+        # Let user know
+        print(colored("[+] Script generated!\n\n", "green"))
+
+        print(colored(f"\t{script}", "light_cyan"))
+
+        # Generate TTS for the script, the provider splits it into
+        # balanced chunks, generates them in parallel and joins them
+        tts_path = f"../temp/{uuid4()}.mp3"
+
+        eleven_tts(script,
+                   voice=eleven_voice,
+                   filename=tts_path)
+
+        # tiktok_tts(script,
+        #            voice="en_us_006",
+        #            filename=tts_path)
+
+        audio_clip = AudioFileClip(tts_path)
+        narration_duration = audio_clip.duration
+        audio_clip.close()
+
+        # Generate subtitles, and get where every sentence
+        # ends from the transcript, so cuts can land there
+        subtitles_path, cut_points = generate_subtitles(tts_path)
+
         # Generate search terms
         search_terms = get_search_terms(
             data["videoSubject"], AMOUNT_OF_STOCK_VIDEOS, script
         )
 
-        # Search for a video of the given search term
-        video_urls = []
+        # Search for videos of the given search terms
+        footage = []
+        extra_footage = []
 
-        # Loop through all search terms,
-        # and search for a video of the given search term
+        # Loop through all search terms, use the best video of every
+        # search term and keep the others in case we need more footage
         for search_term in search_terms:
-            found_url = search_for_stock_videos(
-                search_term, os.getenv("PEXELS_API_KEY")
+            found_videos = search_for_stock_videos(
+                search_term, os.getenv("PEXELS_API_KEY"), VIDEOS_PER_SEARCH_TERM
             )
 
-            if found_url != None and found_url not in video_urls and found_url != "":
-                video_urls.append(found_url)
+            # Skip videos that were already found
+            seen_urls = [f["url"] for f in footage + extra_footage]
+            found_videos = [v for v in found_videos if v["url"] not in seen_urls]
+
+            footage += found_videos[:1]
+            extra_footage += found_videos[1:]
 
-        # Define video_paths
+        # Add more videos until they cover the narration
+        while extra_footage and sum(f["duration"] for f in footage) < narration_duration:
+            footage.append(extra_footage.pop(0))
+
+        # Plan the timeline with the durations Pexels reports,
+        # so we know how much of every video to download
+        planned = plan_timeline([f["duration"] for f in footage], narration_duration, cut_points)
+        needed = needed_durations(planned, len(footage))
+
+        # Define video_paths and the duration of every saved video
         video_paths = []
+        saved_durations = []
 
         # Let user know
         print(colored("[+] Downloading videos...", "blue"))
 
-        # Save the videos
-        for video_url in video_urls:
+        # Save the videos, skipping the ones the timeline does not use
+        for video, needed_duration in zip(footage, needed):
+            if needed_duration <= 0:
+                continue
+
+            requested_duration = min(video["duration"], needed_duration + FOOTAGE_MARGIN)
             try:
-                saved_video_path = save_video(video_url)
+                saved_video_path = save_video(video["url"], duration=requested_duration)
+
+                # Pexels durations are rounded, and a partial download may
+                # end early, so measure what was actually saved
+                saved_duration = video_duration(saved_video_path)
+                if saved_duration <= 0:
+                    raise ValueError("Saved video is empty.")
+
                 video_paths.append(saved_video_path)
+                saved_durations.append(saved_duration)
             except:
-                print(colored("[-] Could not download video: " + video_url, "red"))
+                print(colored("[-] Could not download video: " + video["url"], "red"))
 
         # Let user know
         print(colored("[+] Videos downloaded!", "green"))
 
-        # Let user know
-        print(colored("[+] Script generated!\n\n", "green"))
+        # Plan again with the real durations of the saved videos
+        segments = plan_timeline(saved_durations, narration_duration, cut_points)
 
-        print(colored(f"\t{script}", "light_cyan"))
+        # Put everything together in a single render pass
+        # The lower-bitrate rendition is only encoded if the client asks for it
+        video_key = get_render_worker().submit(
+            video_paths, segments, tts_path, subtitles_path,
+            low_rendition=bool(data.get("lowRendition", False)),
+        ).result()
+        final_video_path = f"{request.host_url}videos/{video_key}.mp4"
 
-        # Split script into sentences
-        sentences = script.split(". ")
-        # Remove empty strings
-        sentences = list(filter(lambda x: x != "", sentences))
-        paths = []
-        # Generate TTS for every sentence
-        for sentence in sentences:
-            current_tts_path = f"../temp/{uuid4()}.mp3"
-            
-            eleven_tts(sentence, 
-                        voice=eleven_voice,
-                       filename=current_tts_path)
-            
-            # tiktok_tts(sentence,
-            #            voice="en_us_006",
-            #            filename=current_tts_path)
-            
-            audio_clip = AudioFileClip(current_tts_path)
-            paths.append(audio_clip)
-            
-
-        # Combine all TTS files using moviepy
-        final_audio = concatenate_audioclips(paths)
-        tts_path = f"../temp/{uuid4()}.mp3"
-        final_audio.write_audiofile(tts_path)
-        audio_clip.close()
+        # Only link the rendition and the poster if they were created
+        low_video_url = None
+        if stored_path(f"{video_key}.low.mp4"):
+            low_video_url = f"{request.host_url}videos/{video_key}.low.mp4"
 
-        # Generate subtitles
-        subtitles_path = generate_subtitles(tts_path)
-
-        # Concatenate videos
-        temp_audio = AudioFileClip(tts_path)
-        combined_video_path = combine_videos(video_paths, temp_audio.duration)
-        temp_audio.close()
-        
-        # Put everything together
-        final_video_path = generate_video(combined_video_path, tts_path, subtitles_path)
+        poster_url = None
+        if stored_path(f"{video_key}.jpg"):
+            poster_url = f"{request.host_url}videos/{video_key}.jpg"
 
         # Let user know
         print(colored("[+] Video generated!", "green"))
@@ -146,13 +189,17 @@ def generate():
         print(colored(f"[+] Path: {final_video_path}", "green"))
 
         # Return JSON
-        return jsonify(
-            {
-                "status": "success",
-                "message": "Video generated!",
-                "videoUrl": final_video_path,
-            }
-        )
+        response = {
+            "status": "success",
+            "message": "Video generated!",
+            "videoUrl": final_video_path,
+        }
+        if low_video_url:
+            response["lowVideoUrl"] = low_video_url
+        if poster_url:
+            response["posterUrl"] = poster_url
+
+        return jsonify(response)
     except Exception as err:
         print(colored("[-] Error: " + str(err), "red"))
         return jsonify(
@@ -164,6 +211,18 @@ def generate():
         )
         
     
+# Video Endpoint
+@app.route("/videos/<filename>", methods=["GET"])
+def videos(filename: str):
+    path = stored_path(filename)
+    if path is None:
+        abort(404)
+
+    # Stored files are named after their contents, so they never change.
+    # conditional=True answers HTTP range requests, so players can seek.
+    return send_file(path, conditional=True, max_age=STORED_VIDEO_MAX_AGE)
+
+
 def remove_special_characters(script: str) -> str:
     """
     Remove special characters from a script.
@@ -176,5 +235,28 @@ def remove_special_characters(script: str) -> str:
     """
     return script.replace("*", "").replace("#", "")
 
+def warm_up() -> None:
+    """
+    Fetches the voice catalog and starts the render worker in the
+    background, then reports how long startup took.
+
+    Returns:
+        None
+    """
+    warm_voices()
+    get_render_worker()
+    startup_report(STARTED_AT)
+
 if __name__ == "__main__":
-    app.run(debug=True, host=HOST, port=PORT)
+    # With debug=True, the reloader runs this script in a parent process
+    # that only watches files; warm up in the process that serves requests
+    if not DEBUG or is_running_from_reloader():
+        warm_up()
+
+    app.run(debug=DEBUG, host=HOST, port=PORT)
+else:
+    # Imported by a WSGI server (e.g. "gunicorn main:app"), every worker
+    # process imports the app once, so warm it up right away. With
+    # gunicorn's --preload, call warm_up() from a post_fork hook instead,
+    # since the background threads don't survive the fork.
+    warm_up()
@@ -0,0 +1,174 @@
+import uuid
+import queue
+import threading
+
+from typing import List
+from functools import lru_cache
+from concurrent.futures import Future
+from termcolor import colored
+from utils import lazy_import
+from timeline import Segment
+from storage import publish_video
+from video import assemble_timeline
+
+FONT_PATH = "../fonts/bold_font.ttf"
+
+# Subtitle style, same as the ImageMagick TextClips used before
+SUBTITLE_FONT_SIZE = 100
+SUBTITLE_COLOR = "#FFFF00"
+SUBTITLE_STROKE_COLOR = "black"
+SUBTITLE_STROKE_WIDTH = 5
+
+# Encoder settings shared by every render job
+ENCODER_SETTINGS = {
+    "fps": 30,
+    "codec": "libx264",
+    "threads": 3,
+    # Put the moov atom first, so playback starts before the download ends
+    "ffmpeg_params": ["-movflags", "+faststart"],
+}
+
+@lru_cache(maxsize=None)
+def load_font(path: str = FONT_PATH, size: int = SUBTITLE_FONT_SIZE):
+    """
+    Loads a TrueType font once and keeps it in memory.
+
+    Args:
+        path (str): The path to the font file.
+        size (int): The font size.
+
+    Returns:
+        ImageFont.FreeTypeFont: The loaded font.
+    """
+    return lazy_import("PIL.ImageFont").truetype(path, size)
+
+def make_subtitle_clip(txt: str):
+    """
+    Renders a subtitle with Pillow, instead of spawning ImageMagick
+    for every line like moviepy's TextClip does.
+
+    Args:
+        txt (str): The text of the subtitle.
+
+    Returns:
+        ImageClip: The subtitle, with a transparency mask.
+    """
+    np = lazy_import("numpy")
+    Image = lazy_import("PIL.Image")
+    ImageDraw = lazy_import("PIL.ImageDraw")
+    ImageClip = lazy_import("moviepy.video.VideoClip").ImageClip
+
+    font = load_font()
+
+    # Measure the text, including its outline
+    measure = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+    left, top, right, bottom = measure.multiline_textbbox(
+        (0, 0), txt, font=font, stroke_width=SUBTITLE_STROKE_WIDTH, align="center"
+    )
+
+    image = Image.new("RGBA", (max(right - left, 1), max(bottom - top, 1)), (0, 0, 0, 0))
+    ImageDraw.Draw(image).multiline_text(
+        (-left, -top), txt, font=font, fill=SUBTITLE_COLOR, align="center",
+        stroke_width=SUBTITLE_STROKE_WIDTH, stroke_fill=SUBTITLE_STROKE_COLOR
+    )
+
+    return ImageClip(np.array(image))
+
+def render_job(video_paths: List[str], segments: List[Segment], tts_path: str, subtitles_path: str, poster: bool = True, low_rendition: bool = False) -> str:
+    """
+    Renders the final video in a single pass: the timeline is cut,
+    the subtitles are burned in and the narration is muxed by one
+    ffmpeg encoder, without an intermediate combined video.
+
+    Args:
+        video_paths (List[str]): The paths to the stock videos.
+        segments (List[Segment]): The timeline, see timeline.plan_timeline.
+        tts_path (str): The path to the text-to-speech audio.
+        subtitles_path (str): The path to the subtitles.
+        poster (bool): Whether to also write a poster thumbnail.
+        low_rendition (bool): Whether to also write a lower-bitrate rendition.
+
+    Returns:
+        str: The storage key of the final video, see storage.publish_video.
+    """
+    SubtitlesClip = lazy_import("moviepy.video.tools.subtitles").SubtitlesClip
+    CompositeVideoClip = lazy_import("moviepy.video.compositing.CompositeVideoClip").CompositeVideoClip
+
+    footage, sources = assemble_timeline(video_paths, segments)
+
+    try:
+        # Burn the subtitles into the video
+        subtitles = SubtitlesClip(subtitles_path, make_subtitle_clip)
+        result = CompositeVideoClip([
+            footage,
+            subtitles.set_pos(("center", "center"))
+        ])
+
+        output_path = f"../temp/{uuid.uuid4()}.mp4"
+
+        # Pass the narration as a file, so ffmpeg muxes it
+        # directly instead of moviepy decoding and re-writing it
+        result.write_videofile(output_path, audio=tts_path, **ENCODER_SETTINGS)
+    finally:
+        for source in sources:
+            source.close()
+
+    return publish_video(output_path, poster, low_rendition)
+
+class RenderWorker(threading.Thread):
+    """
+    A long-lived thread that renders videos from a local queue.
+
+    The subtitle font and the encoder settings are loaded once and
+    reused by every job.
+    """
+
+    def __init__(self):
+        super().__init__(name="render-worker", daemon=True)
+        self.jobs = queue.Queue()
+
+    def submit(self, video_paths: List[str], segments: List[Segment], tts_path: str, subtitles_path: str, poster: bool = True, low_rendition: bool = False) -> Future:
+        """
+        Queues a render job, see render_job.
+
+        Returns:
+            Future: Resolves to the storage key of the final video.
+        """
+        future = Future()
+        self.jobs.put((future, (video_paths, segments, tts_path, subtitles_path, poster, low_rendition)))
+
+        return future
+
+    def run(self) -> None:
+        # Warm up the font before the first job arrives
+        try:
+            load_font()
+        except OSError as err:
+            print(colored(f"[-] Could not load subtitle font: {err}", "red"))
+
+        while True:
+            future, args = self.jobs.get()
+
+            if future.set_running_or_notify_cancel():
+                try:
+                    future.set_result(render_job(*args))
+                except Exception as err:
+                    future.set_exception(err)
+
+            self.jobs.task_done()
+
+_worker = None
+_worker_lock = threading.Lock()
+
+def get_render_worker() -> RenderWorker:
+    """
+    Returns the render worker, starting it on first use.
+    """
+    global _worker
+
+    with _worker_lock:
+        if _worker is None:
+            _worker = RenderWorker()
+            _worker.start()
+
+    return _worker
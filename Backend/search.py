@@ -3,16 +3,50 @@ import requests
 from typing import List
 from termcolor import colored
 
-def search_for_stock_videos(query: str, api_key: str) -> List[str]:
+# Renditions at least this tall fill a 1080x1920 short without upscaling,
+# the minimum one is used when no rendition is that tall
+FULL_HEIGHT = 1920
+MIN_HEIGHT = 1080
+
+def choose_rendition(video_files: List[dict]) -> dict:
+    """
+    Picks the smallest downloadable rendition that is at least 1920px
+    tall, else the smallest one at least 1080px tall, else the tallest.
+
+    Args:
+        video_files (List[dict]): The "video_files" of a Pexels video.
+
+    Returns:
+        dict: The chosen rendition, or None if none can be downloaded.
+    """
+    # Only keep renditions with a download link
+    renditions = [f for f in video_files if ".com/external" in f["link"]]
+    if not renditions:
+        return None
+
+    def height(f):
+        return f.get("height") or 0
+
+    for min_height in [FULL_HEIGHT, MIN_HEIGHT]:
+        tall_enough = [f for f in renditions if height(f) >= min_height]
+        if tall_enough:
+            return min(tall_enough, key=height)
+
+    # All renditions are small, take the best of them
+    return max(renditions, key=height)
+
+def search_for_stock_videos(query: str, api_key: str, amount: int = 1) -> List[dict]:
     """
     Searches for stock videos based on a query.
 
     Args:
         query (str): The query to search for.
         api_key (str): The API key to use.
+        amount (int): The amount of videos to return at most.
 
     Returns:
-        List[str]: A list of stock videos.
+        List[dict]: A list of stock videos, each with its "url"
+            and its "duration" in seconds.
     """
     
     # Build headers
@@ -21,7 +55,8 @@ def search_for_stock_videos(query: str, api_key: str) -> List[str]:
     }
 
     # Build URL
-    url = f"https://api.pexels.com/videos/search?query={query}&per_page=1"
+    # Portrait videos fit the 1080x1920 frame without downloading large files
+    url = f"https://api.pexels.com/videos/search?query={query}&per_page={amount}&orientation=portrait"
 
     # Send the request
     r = requests.get(url, headers=headers)
@@ -29,19 +64,21 @@ def search_for_stock_videos(query: str, api_key: str) -> List[str]:
     # Parse the response
     response = r.json()
 
-    # Get first video url
-    video_urls = response["videos"][0]["video_files"]
-    video_url = ""
+    videos = []
+
+    # Loop through the found videos
+    for video in response["videos"]:
+        rendition = choose_rendition(video["video_files"])
+        if rendition is None:
+            continue
 
-    # Loop through video urls
-    for video in video_urls:
-        # Check if video has a download link
-        if ".com/external" in video["link"]:
-            # Set video url
-            video_url = video["link"]
+        videos.append({
+            "url": rendition["link"],
+            "duration": float(video["duration"]),
+        })
 
-    # Let user know
-    print(colored(f"\t=>{video_url}", "light_cyan"))
+        # Let user know
+        print(colored(f"\t=>{rendition['link']} ({video['duration']}s)", "light_cyan"))
 
-    # Return the video url
-    return video_url
+    # Return the videos
+    return videos
@@ -0,0 +1,196 @@
+import os
+import re
+import shutil
+import hashlib
+import subprocess
+import threading
+
+from typing import List
+from utils import lazy_import
+from termcolor import colored
+
+STORAGE_DIRECTORY = "../videos"
+
+# Oldest videos are removed once either limit is exceeded
+MAX_STORED_VIDEOS = 100
+MAX_STORAGE_BYTES = 5 * 1024 ** 3
+
+# Poster thumbnail and lower-bitrate rendition
+LOW_RENDITION_SIZE = "540:960"
+LOW_RENDITION_BITRATE = "800k"
+POSTER_TIME = 1.0
+
+# <key>.mp4, <key>.low.mp4 or <key>.jpg
+_FILENAME = re.compile(r"^[0-9a-f]{32}(\.low\.mp4|\.mp4|\.jpg)$")
+
+_storage_lock = threading.Lock()
+
+def content_key(path: str) -> str:
+    """
+    Hashes the contents of a file.
+
+    Args:
+        path (str): The path to the file.
+
+    Returns:
+        str: The first 32 hex digits of the SHA-256 of the file.
+    """
+    digest = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+
+    return digest.hexdigest()[:32]
+
+def _ffmpeg(*args: str) -> None:
+    ffmpeg = lazy_import("moviepy.config").get_setting("FFMPEG_BINARY")
+
+    subprocess.run([ffmpeg, "-y", "-loglevel", "error", *args], check=True)
+
+def make_poster(video_path: str, poster_path: str) -> None:
+    """
+    Writes a poster thumbnail of a video. Seeking before the input
+    only decodes the frames around POSTER_TIME.
+
+    Args:
+        video_path (str): The path to the video.
+        poster_path (str): Where to write the poster thumbnail.
+
+    Returns:
+        None
+    """
+    _ffmpeg("-ss", str(POSTER_TIME), "-i", video_path, "-frames:v", "1", poster_path)
+
+def make_low_rendition(video_path: str, low_path: str) -> None:
+    """
+    Writes a lower-bitrate fast-start rendition of a video.
+
+    Args:
+        video_path (str): The path to the video.
+        low_path (str): Where to write the lower-bitrate rendition.
+
+    Returns:
+        None
+    """
+    _ffmpeg(
+        "-i", video_path,
+        "-map", "0:v", "-map", "0:a?",
+        "-vf", f"scale={LOW_RENDITION_SIZE}",
+        "-c:v", "libx264", "-b:v", LOW_RENDITION_BITRATE,
+        "-c:a", "copy",
+        "-movflags", "+faststart",
+        low_path,
+    )
+
+def publish_video(video_path: str, poster: bool = True, low_rendition: bool = False) -> str:
+    """
+    Moves a rendered video into the content-addressed store,
+    optionally alongside a poster and a lower-bitrate rendition.
+
+    Args:
+        video_path (str): The path to the rendered video.
+        poster (bool): Whether to also write a poster thumbnail.
+        low_rendition (bool): Whether to also write a lower-bitrate rendition,
+            which costs another full encode, so only do it when asked for.
+
+    Returns:
+        str: The key of the video, its files are named after it.
+            The poster and rendition may be missing, check stored_path.
+    """
+    key = content_key(video_path)
+
+    if not os.path.exists(STORAGE_DIRECTORY):
+        os.makedirs(STORAGE_DIRECTORY)
+
+    final_path = os.path.join(STORAGE_DIRECTORY, f"{key}.mp4")
+    low_path = os.path.join(STORAGE_DIRECTORY, f"{key}.low.mp4")
+    poster_path = os.path.join(STORAGE_DIRECTORY, f"{key}.jpg")
+
+    if os.path.exists(final_path):
+        # Same video was already published, keep it as recent
+        os.remove(video_path)
+        os.utime(final_path)
+    else:
+        shutil.move(video_path, final_path)
+
+    # Also covers a published video whose extra files failed before
+    extras = [
+        (poster, poster_path, make_poster),
+        (low_rendition, low_path, make_low_rendition),
+    ]
+    for wanted, path, make in extras:
+        if wanted and not os.path.exists(path):
+            try:
+                make(final_path, path)
+            except (OSError, subprocess.CalledProcessError) as err:
+                print(colored(f"[-] Could not create {os.path.basename(path)}: {err}", "red"))
+
+    enforce_retention()
+
+    return key
+
+def _stored_files(key: str) -> List[str]:
+    names = [f"{key}.mp4", f"{key}.low.mp4", f"{key}.jpg"]
+    paths = [os.path.join(STORAGE_DIRECTORY, name) for name in names]
+
+    return [path for path in paths if os.path.exists(path)]
+
+def enforce_retention() -> None:
+    """
+    Removes the oldest videos, with their renditions, until the store
+    is within MAX_STORED_VIDEOS and MAX_STORAGE_BYTES.
+
+    Returns:
+        None
+    """
+    with _storage_lock:
+        keys = [
+            name[:-len(".mp4")] for name in os.listdir(STORAGE_DIRECTORY)
+            if _FILENAME.match(name) and name.endswith(".mp4") and not name.endswith(".low.mp4")
+        ]
+
+        # Oldest first
+        keys.sort(key=lambda k: os.path.getmtime(os.path.join(STORAGE_DIRECTORY, f"{k}.mp4")))
+
+        sizes = {k: sum(os.path.getsize(p) for p in _stored_files(k)) for k in keys}
+        total_size = sum(sizes.values())
+
+        while keys and (len(keys) > MAX_STORED_VIDEOS or total_size > MAX_STORAGE_BYTES):
+            key = keys.pop(0)
+            remove_video(key)
+            total_size -= sizes[key]
+
+            print(colored(f"[+] Removed old video {key}", "blue"))
+
+def remove_video(key: str) -> None:
+    """
+    Removes a stored video, with its rendition and poster.
+
+    Args:
+        key (str): The key of the video.
+
+    Returns:
+        None
+    """
+    for path in _stored_files(key):
+        os.remove(path)
+
+def stored_path(filename: str) -> str:
+    """
+    Returns the path to a stored file, or None if there is no such file.
+
+    Args:
+        filename (str): The name of the file, e.g. "<key>.mp4".
+
+    Returns:
+        str: The path to the file.
+    """
+    if not _FILENAME.match(filename):
+        return None
+
+    path = os.path.join(STORAGE_DIRECTORY, filename)
+    if not os.path.exists(path):
+        return None
+
+    return path
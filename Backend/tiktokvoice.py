@@ -5,7 +5,8 @@
 # credits: https://github.com/oscie57/tiktok-voice
 
 import threading, requests, base64
-from playsound import playsound
+from utils import lazy_import
+from chunking import chunk_text, join_audio
 
 VOICES = [
     # DISNEY VOICES
@@ -65,25 +66,8 @@ ENDPOINTS = [
 current_endpoint = 0
 # in one conversion, the text can have a maximum length of 300 characters
 TEXT_BYTE_LIMIT = 300
-
-
-# create a list by splitting a string, every element has n chars
-def split_string(string: str, chunk_size: int) -> list[str]:
-    words = string.split()
-    result = []
-    current_chunk = ""
-    for word in words:
-        if (
-            len(current_chunk) + len(word) + 1 <= chunk_size
-        ):  # Check if adding the word exceeds the chunk size
-            current_chunk += " " + word
-        else:
-            if current_chunk:  # Append the current chunk if not empty
-                result.append(current_chunk.strip())
-            current_chunk = word
-    if current_chunk:  # Append the last chunk if not empty
-        result.append(current_chunk.strip())
-    return result
+# longer texts are split into chunks of about this size, converted in parallel
+TARGET_CHUNK_SIZE = 200
 
 
 # checking if the website that provides the service is available
@@ -146,56 +130,43 @@ def tts(
 
     # creating the audio file
     try:
-        if len(text) < TEXT_BYTE_LIMIT:
-            audio = generate_audio((text), voice)
+        # Split the text into balanced chunks the service accepts
+        text_parts = chunk_text(text, TEXT_BYTE_LIMIT - 1, TARGET_CHUNK_SIZE)
+        audio_base64_data = [None] * len(text_parts)
+
+        # Define a thread function to generate audio for each text part
+        def generate_audio_thread(text_part, index):
+            audio = generate_audio(text_part, voice)
             if current_endpoint == 0:
-                audio_base64_data = str(audio).split('"')[5]
+                base64_data = str(audio).split('"')[5]
             else:
-                audio_base64_data = str(audio).split('"')[3].split(",")[1]
+                base64_data = str(audio).split('"')[3].split(",")[1]
 
-            if audio_base64_data == "error":
-                print("This voice is unavailable right now")
-                return
+            audio_base64_data[index] = base64_data
 
-        else:
-            # Split longer text into smaller parts
-            text_parts = split_string(text, 299)
-            audio_base64_data = [None] * len(text_parts)
-
-            # Define a thread function to generate audio for each text part
-            def generate_audio_thread(text_part, index):
-                audio = generate_audio(text_part, voice)
-                if current_endpoint == 0:
-                    base64_data = str(audio).split('"')[5]
-                else:
-                    base64_data = str(audio).split('"')[3].split(",")[1]
-
-                if audio_base64_data == "error":
-                    print("This voice is unavailable right now")
-                    return "error"
-
-                audio_base64_data[index] = base64_data
-
-            threads = []
-            for index, text_part in enumerate(text_parts):
-                # Create and start a new thread for each text part
-                thread = threading.Thread(
-                    target=generate_audio_thread, args=(text_part, index)
-                )
-                thread.start()
-                threads.append(thread)
-
-            # Wait for all threads to complete
-            for thread in threads:
-                thread.join()
-
-            # Concatenate the base64 data in the correct order
-            audio_base64_data = "".join(audio_base64_data)
-
-        save_audio_file(audio_base64_data, filename)
+        threads = []
+        for index, text_part in enumerate(text_parts):
+            # Create and start a new thread for each text part
+            thread = threading.Thread(
+                target=generate_audio_thread, args=(text_part, index)
+            )
+            thread.start()
+            threads.append(thread)
+
+        # Wait for all threads to complete
+        for thread in threads:
+            thread.join()
+
+        if "error" in audio_base64_data or None in audio_base64_data:
+            print("This voice is unavailable right now")
+            return
+
+        # Decode every part on its own, joined base64 strings are not a valid MP3
+        join_audio([base64.b64decode(data) for data in audio_base64_data], filename)
         print(f"Audio file saved successfully as '{filename}'")
         if play_sound:
-            playsound(filename)
+            # playsound is only needed when playing back, so load it lazily
+            lazy_import("playsound").playsound(filename)
 
     except Exception as e:
         print("Error occurred while generating audio:", str(e))
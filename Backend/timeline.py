@@ -0,0 +1,113 @@
+from typing import List, NamedTuple
+
+# Segments shorter than this are not worth a cut
+MIN_SEGMENT_DURATION = 1.5
+
+class Segment(NamedTuple):
+    """
+    A piece of a stock clip placed on the video timeline.
+
+    Attributes:
+        clip (int): The index of the clip the segment is taken from.
+        start (float): Where the segment starts inside the clip, in seconds.
+        duration (float): How long the segment is, in seconds.
+    """
+    clip: int
+    start: float
+    duration: float
+
+    @property
+    def end(self) -> float:
+        return self.start + self.duration
+
+def plan_timeline(clip_durations: List[float], total_duration: float, cut_points: List[float] = None) -> List[Segment]:
+    """
+    Fills the narration with segments of the given clips.
+
+    Clips are used in turn, each covering roughly an equal share of the
+    narration. Cuts are moved to the nearest sentence boundary when one
+    fits inside the clip. A segment never runs past the end of its clip:
+    when the footage runs out, the next clip takes over, and clips are
+    looped once all of them have been used.
+
+    Args:
+        clip_durations (List[float]): The duration of every clip.
+        total_duration (float): The duration of the narration.
+        cut_points (List[float]): Times at which a cut is preferred.
+
+    Returns:
+        List[Segment]: The segments, in playback order.
+    """
+    clip_durations = list(clip_durations)
+    if not clip_durations or max(clip_durations) <= 0:
+        raise ValueError("No footage to fill the timeline with.")
+
+    cut_points = sorted(c for c in (cut_points or []) if 0 < c < total_duration)
+    target = total_duration / len(clip_durations)
+
+    # How far into every clip we already are
+    offsets = [0.0] * len(clip_durations)
+
+    segments = []
+    elapsed = 0.0
+    index = 0
+
+    while total_duration - elapsed > 1e-6:
+        needed = min(MIN_SEGMENT_DURATION, total_duration - elapsed)
+        clip = _next_clip(clip_durations, offsets, index, needed)
+
+        if clip is None:
+            # All footage has been used, loop the clips from the beginning
+            offsets = [0.0] * len(clip_durations)
+            clip = _next_clip(clip_durations, offsets, index, needed)
+            if clip is None:
+                clip = max(range(len(clip_durations)), key=lambda c: clip_durations[c])
+
+        index = clip + 1
+        available = clip_durations[clip] - offsets[clip]
+        latest = min(elapsed + available, total_duration)
+
+        # Prefer the sentence boundary closest to an equal share
+        candidates = [c for c in cut_points if elapsed + MIN_SEGMENT_DURATION <= c <= latest]
+        if candidates:
+            end = min(candidates, key=lambda c: abs(c - (elapsed + target)))
+        else:
+            end = min(elapsed + target, latest)
+
+        # Don't leave a sliver at the end of the video
+        if total_duration - end < MIN_SEGMENT_DURATION and total_duration <= latest:
+            end = total_duration
+
+        segments.append(Segment(clip, offsets[clip], end - elapsed))
+        offsets[clip] += end - elapsed
+        elapsed = end
+
+    return segments
+
+def _next_clip(clip_durations: List[float], offsets: List[float], index: int, needed: float) -> int:
+    # The first clip from index on that has enough footage left, or None
+    for step in range(len(clip_durations)):
+        clip = (index + step) % len(clip_durations)
+        if clip_durations[clip] - offsets[clip] >= needed:
+            return clip
+
+    return None
+
+def needed_durations(segments: List[Segment], clip_count: int) -> List[float]:
+    """
+    Returns how many seconds of every clip the timeline uses,
+    starting from the beginning of the clip.
+
+    Args:
+        segments (List[Segment]): The planned segments.
+        clip_count (int): The amount of clips that were planned with.
+
+    Returns:
+        List[float]: The used length of every clip, 0 for unused clips.
+    """
+    needed = [0.0] * clip_count
+
+    for segment in segments:
+        needed[segment.clip] = max(needed[segment.clip], segment.end)
+
+    return needed
@@ -1,7 +1,17 @@
 import os
+import time
+import importlib
+import threading
 
+from types import ModuleType
+from typing import Dict
 from termcolor import colored
 
+# Modules loaded through lazy_import, and how long each took to load
+_lazy_modules: Dict[str, ModuleType] = {}
+_load_times: Dict[str, float] = {}
+_lazy_lock = threading.Lock()
+
 
 def clean_dir(path: str) -> None:
     """
@@ -20,3 +30,54 @@ def clean_dir(path: str) -> None:
         os.remove(os.path.join(path, file))
 
     print(colored(f"[+] Cleaned {path} directory", "green"))
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Imports a module the first time it is needed and caches it.
+
+    Heavy provider libraries (g4f, moviepy, assemblyai, elevenlabs) are
+    loaded through this function, so that the backend boots without them.
+
+    Args:
+        name (str): The dotted name of the module to import.
+
+    Returns:
+        ModuleType: The imported module.
+    """
+    module = _lazy_modules.get(name)
+    if module is not None:
+        return module
+
+    with _lazy_lock:
+        # Another thread may have loaded it while we were waiting
+        if name not in _lazy_modules:
+            start = time.perf_counter()
+            _lazy_modules[name] = importlib.import_module(name)
+            _load_times[name] = time.perf_counter() - start
+
+            print(colored(f"[+] Loaded {name} in {_load_times[name]:.2f}s", "blue"))
+
+    return _lazy_modules[name]
+
+
+def startup_report(started_at: float) -> None:
+    """
+    Prints how long the backend took to start, and which
+    providers have already been loaded.
+
+    Args:
+        started_at (float): The time.perf_counter() value at process start.
+
+    Returns:
+        None
+    """
+    elapsed = time.perf_counter() - started_at
+
+    print(colored(f"[+] Backend started in {elapsed:.2f}s", "green"))
+
+    if _load_times:
+        for name, load_time in _load_times.items():
+            print(colored(f"\t{name}: {load_time:.2f}s", "light_cyan"))
+    else:
+        print(colored("\tNo providers loaded yet, they will load on first use.", "light_cyan"))
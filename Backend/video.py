@@ -1,51 +1,90 @@
 import os
+import math
 import uuid
 import requests
+import subprocess
 import srt_equalizer
-import assemblyai as aai
 
-from typing import List
-from moviepy.editor import *
+from typing import List, Tuple
+from utils import lazy_import
+from timeline import Segment
 from termcolor import colored
 from dotenv import load_dotenv
-from moviepy.video.fx.all import crop
-from moviepy.video.tools.subtitles import SubtitlesClip
+
+# moviepy and assemblyai are loaded with lazy_import when first used,
+# since importing moviepy probes for ffmpeg.
 
 load_dotenv("../.env")
 
 ASSEMBLY_AI_API_KEY = os.getenv("ASSEMBLY_AI_API_KEY")
 
-def save_video(video_url: str, directory: str = "../temp") -> str:
+def save_video(video_url: str, directory: str = "../temp", duration: float = None) -> str:
     """
     Saves a video from a given URL and returns the path to the video.
 
     Args:
         video_url (str): The URL of the video to save.
+        directory (str): The directory to save the video to.
+        duration (float): Only save the first seconds of the video.
 
     Returns:
         str: The path to the saved video.
     """
     video_id = uuid.uuid4()
     video_path = f"{directory}/{video_id}.mp4"
+
+    if duration is not None:
+        # ffmpeg only requests the byte ranges it needs from the server
+        ffmpeg = lazy_import("moviepy.config").get_setting("FFMPEG_BINARY")
+        try:
+            subprocess.run([
+                ffmpeg, "-y", "-loglevel", "error",
+                "-i", video_url,
+                "-t", f"{duration:.2f}",
+                "-an", "-c", "copy",
+                video_path,
+            ], check=True)
+
+            return video_path
+        except (OSError, subprocess.CalledProcessError) as err:
+            print(colored(f"[*] Partial download failed, downloading the whole video: {err}", "yellow"))
+
     with open(video_path, "wb") as f:
         f.write(requests.get(video_url).content)
 
     return video_path
 
-def generate_subtitles(audio_path: str) -> str:
+def video_duration(video_path: str) -> float:
+    """
+    Reads the duration of a saved video from its container.
+
+    Args:
+        video_path (str): The path to the video.
+
+    Returns:
+        float: The duration of the video in seconds.
+    """
+    ffmpeg_reader = lazy_import("moviepy.video.io.ffmpeg_reader")
+
+    return ffmpeg_reader.ffmpeg_parse_infos(video_path)["duration"]
+
+def generate_subtitles(audio_path: str) -> Tuple[str, List[float]]:
     """
-    Generates subtitles from a given audio file and returns the path to the subtitles.
+    Generates subtitles from a given audio file and returns the path to the subtitles,
+    along with the times at which the transcribed sentences end.
 
     Args:
         audio_path (str): The path to the audio file to generate subtitles from.
 
     Returns:
-        str: The path to the generated subtitles.
+        Tuple[str, List[float]]: The path to the generated subtitles, and the
+            end time of every sentence in seconds (empty if unavailable).
     """
     def equalize_subtitles(srt_path: str, max_chars: int = 10) -> None:
       # Equalize subtitles
       srt_equalizer.equalize_srt_file(srt_path, srt_path, max_chars)
 
+    aai = lazy_import("assemblyai")
     aai.settings.api_key = ASSEMBLY_AI_API_KEY
 
     transcriber = aai.Transcriber()
@@ -65,81 +104,70 @@ def generate_subtitles(audio_path: str) -> str:
 
     print(colored("[+] Subtitles generated.", "green"))
 
-    return subtitles_path
+    # Sentence timestamps, so cuts can land between sentences
+    try:
+        sentence_ends = [sentence.end / 1000 for sentence in transcript.get_sentences()]
+    except Exception as err:
+        print(colored(f"[*] Could not get sentence timestamps: {err}", "yellow"))
+        sentence_ends = []
+
+    return subtitles_path, sentence_ends
 
 
 
-def combine_videos(video_paths: List[str], max_duration: int) -> str:
+def assemble_timeline(video_paths: List[str], segments: List[Segment]):
     """
-    Combines a list of videos into one video and returns the path to the combined video.
+    Cuts the planned segments out of the videos and concatenates them,
+    without writing anything to disk.
 
     Args:
         video_paths (list): A list of paths to the videos to combine.
-        max_duration (int): The maximum duration of the combined video.
+        segments (List[Segment]): The timeline, see timeline.plan_timeline.
 
     Returns:
-        str: The path to the combined video.
+        Tuple[VideoClip, list]: The concatenated clip, and the opened
+            source videos, which have to be closed once it is written.
     """
-    video_id = uuid.uuid4()
-    combined_video_path = f"../temp/{video_id}.mp4"
+    crop = lazy_import("moviepy.video.fx.crop").crop
+    resize = lazy_import("moviepy.video.fx.resize").resize
+    VideoFileClip = lazy_import("moviepy.video.io.VideoFileClip").VideoFileClip
+    concatenate_videoclips = lazy_import("moviepy.video.compositing.concatenate").concatenate_videoclips
 
-    print(colored("[+] Combining videos...", "blue"))
-    print(colored(f"[+] Each video will be {max_duration / len(video_paths)} seconds long.", "blue"))
+    # Open every video once, even if it is used for several segments
+    sources = {}
 
     clips = []
-    for video_path in video_paths:
-        clip = VideoFileClip(video_path)
-        clip = clip.without_audio()
-        clip = clip.subclip(0, max_duration / len(video_paths))
+    for segment in segments:
+        if segment.clip not in sources:
+            sources[segment.clip] = VideoFileClip(video_paths[segment.clip], audio=False)
+
+        source = sources[segment.clip]
+
+        # The timeline has to be planned with the durations of the saved
+        # videos, a shorter segment would freeze the last frame
+        if segment.end > source.duration + 1e-3:
+            raise ValueError(
+                f"Segment {segment.start:.2f}-{segment.end:.2f}s runs past the end of "
+                f"{video_paths[segment.clip]} ({source.duration:.2f}s)."
+            )
+
+        clip = source.subclip(segment.start, min(segment.end, source.duration))
         clip = clip.set_fps(30)
 
-        # Not all videos are same size,
-        # so we need to resize them
+        # Not all videos are same size, so scale them until
+        # they cover the frame, then crop the center
+        scale = max(1080 / clip.w, 1920 / clip.h)
+        if scale != 1:
+            # Round up, a truncated 1079 or 1919 would not cover the frame
+            clip = clip.fx(resize, (math.ceil(clip.w * scale), math.ceil(clip.h * scale)))
+
         clip = crop(clip, width=1080, height=1920, \
                     x_center=clip.w / 2, \
                         y_center=clip.h / 2)
-        clip = clip.resize((1080, 1920))
 
         clips.append(clip)
 
     final_clip = concatenate_videoclips(clips)
     final_clip = final_clip.set_fps(30)
-    final_clip.write_videofile(combined_video_path, threads=3)
-
-    return combined_video_path
 
-def generate_video(combined_video_path: str, tts_path: str, subtitles_path: str) -> str:
-    """
-    This function creates the final video, with subtitles and audio.
-
-    Args:
-        combined_video_path (str): The path to the combined video.
-        tts_path (str): The path to the text-to-speech audio.
-        subtitles_path (str): The path to the subtitles.
-
-    Returns:
-        str: The path to the final video.
-    """
-    # Make a generator that returns a TextClip when called with consecutive
-    generator = lambda txt: TextClip(txt, font=f"../fonts/bold_font.ttf", fontsize=100, color="#FFFF00",
-    stroke_color="black", stroke_width=5)
-
-    # Burn the subtitles into the video
-    subtitles = SubtitlesClip(subtitles_path, generator)
-    result = CompositeVideoClip([
-        VideoFileClip(combined_video_path),
-        subtitles.set_pos(("center", "center"))
-    ])
-
-    # Add the audio
-    audio = AudioFileClip(tts_path)
-    result = result.set_audio(audio)
-    
-    # Create videos directory if it doesn't exist
-    if not os.path.exists("../Frontend/public/videos"):
-        os.makedirs("../Frontend/public/videos")
-
-    filename = f"/public/videos/{uuid.uuid4()}.mp4"
-    result.write_videofile(f"../Frontend{filename}", threads=3)
-
-    return filename
+    return final_clip, list(sources.values())